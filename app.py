@@ -1,47 +1,69 @@
+from collections import OrderedDict
 from dash import Dash, dcc, html
 from dash.dependencies import Input, Output, State
 import os
+import threading
+import time
 
 from ff_league_analyzer.ff_league_analyzer import SleeperLeagueAnalyzer
 from pages import home, roster_distribution, weekly_scoring
 
-def get_valid_leagues() -> list:
-    valid_leagues = [
-        {'label': 'Elite FF 2021', 'value': '736885905629024256'},
-        {'label': 'USFL 2022', 'value': '786691248676257792'}
-    ]
-    return valid_leagues
+VALID_LEAGUES = [
+    {'label': 'Elite FF 2021', 'value': '736885905629024256'},
+    {'label': 'USFL 2022', 'value': '786691248676257792'}
+]
 
-def get_pages_for_dropdown() -> list:
-    pages = [
-        {'label': 'Home', 'value': 'home'},
-        {'label': 'Roster Distribution', 'value': 'roster-distribution'},
-        {'label': 'Weekly Scoring', 'value': 'weekly-scoring'},
-    ]   
-    return pages 
+PAGES = [
+    {'label': 'Home', 'value': 'home'},
+    {'label': 'Roster Distribution', 'value': 'roster-distribution'},
+    {'label': 'Weekly Scoring', 'value': 'weekly-scoring'},
+]
 
-def update_league_analyzer(league_id: str):
-    global league_analyzer
+# Cached analyzers are rebuilt after this long, so scores and rosters pick up new Sleeper data.
+ANALYZER_TTL_SECONDS = 15 * 60
+# Most analyzers kept at once, since the league_id comes from the client and each analyzer holds a whole league.
+ANALYZER_CACHE_SIZE = 32
 
+PAGE_LAYOUTS = {
+    'home': home.layout,
+    'roster-distribution': roster_distribution.layout,
+    'weekly-scoring': weekly_scoring.layout,
+}
+
+def update_league_analyzer(league_id: str) -> SleeperLeagueAnalyzer:
     if not league_id or league_id == '':
-        league_analyzer = None
-        return
-    league_analyzer = SleeperLeagueAnalyzer(league_id=league_id)  
+        return None
+    # Reuse the analyzer (and everything it has already pulled) when a league is re-selected, until it goes stale.
+    with analyzer_cache_lock:
+        cached = analyzer_cache.get(league_id)
+    if cached is None or time.time() - cached[0] > ANALYZER_TTL_SECONDS:
+        cached = (time.time(), SleeperLeagueAnalyzer(league_id=league_id))
+        with analyzer_cache_lock:
+            analyzer_cache[league_id] = cached
+            analyzer_cache.move_to_end(league_id)
+            # Expired analyzers are dropped, then the least recently built ones past the limit.
+            for stale_id in [key for key, (built, _) in analyzer_cache.items() if cached[0] - built > ANALYZER_TTL_SECONDS]:
+                del analyzer_cache[stale_id]
+            while len(analyzer_cache) > ANALYZER_CACHE_SIZE:
+                analyzer_cache.popitem(last=False)
+    return cached[1]
 
 app = Dash(__name__, suppress_callback_exceptions=True)
 server = app.server
-league_analyzer: SleeperLeagueAnalyzer = None 
+# league_id -> (build time, analyzer)
+analyzer_cache: OrderedDict[str, tuple[float, SleeperLeagueAnalyzer]] = OrderedDict()
+analyzer_cache_lock = threading.Lock()
 
 app.layout = html.Div([
     html.H1('Sleeper Fantasy Football Analyzer'),
     dcc.Dropdown(
-        options=get_valid_leagues(), value='', 
+        options=VALID_LEAGUES, value='', 
         id='league-dropdown', 
         style={'width': '50%'}
     ),
     html.H2('Please select a valid league to continue.', id='none-container'),
     dcc.Dropdown(
-        options=get_pages_for_dropdown(), value='home', clearable=False, 
+        options=PAGES, value='home', clearable=False, 
         id='page-dropdown'), 
     html.Br(),
     html.Div(id='page-container'),
@@ -54,8 +76,6 @@ app.layout = html.Div([
     Input('league-dropdown', 'value')
 )
 def league_dropdown_callback(value):
-    update_league_analyzer(value)
-   
     if not value or value == '':
         none_style = {'display': 'block'}
         page_dropdown_style = {'display': 'none'}
@@ -69,22 +89,21 @@ def league_dropdown_callback(value):
 
 @app.callback(
     Output('page-container', 'children'),
-    Input('page-dropdown', 'value')
+    Input('page-dropdown', 'value'),
+    State('league-dropdown', 'value')
 )
-def page_dropdown_callback(page):
+def page_dropdown_callback(page, league_id):
+    page_layout = PAGE_LAYOUTS.get(page)
+    if page_layout is None: return html.Div()
+
+    # The analyzer is only built once a page actually needs it. It's kept local, since callbacks
+    # for different leagues can run at the same time on the threaded server.
+    league_analyzer = update_league_analyzer(league_id)
     if league_analyzer is None: return html.Div()
 
-    match page:
-        case 'home':
-            return home.layout(league_analyzer)
-        case 'roster-distribution':
-            return roster_distribution.layout(league_analyzer)
-        case 'weekly-scoring':
-            return weekly_scoring.layout(league_analyzer)
-    
-    return html.Div()    
+    return page_layout(league_analyzer)
 
 if __name__ == '__main__':
-    debug_at_home = os.environ['COMPUTERNAME'] == 'LAPTOP-2J01O16G'
+    debug_at_home = os.environ.get('COMPUTERNAME') == 'LAPTOP-2J01O16G'
     # debug_at_home = False
     app.run_server(debug=debug_at_home)
\ No newline at end of file
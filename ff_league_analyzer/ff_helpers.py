@@ -0,0 +1,18 @@
+from functools import lru_cache
+import pandas as pd
+
+UNUSED_POSITIONS = frozenset({'LEO', 'LS', 'P'})
+
+@lru_cache(maxsize=None)
+def fantasy_pos_label(positions: tuple) -> str:
+    """
+    Label for one combination of fantasy positions. Only a few dozen combinations exist, so each is built once.
+    """
+    return '/'.join(sorted(pos for pos in positions if pos and pos[0] != 'O' and pos not in UNUSED_POSITIONS))
+
+def expand_to_str_columns(dicts: pd.Series) -> pd.DataFrame:
+    """
+    Expands a column of dicts into string columns with a single DataFrame construction, keeping missing keys as NaN.
+    """
+    df = pd.DataFrame([d or {} for d in dicts], index=dicts.index, dtype=object)
+    return df.astype(str).mask(df.isna())
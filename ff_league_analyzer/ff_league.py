@@ -1,12 +1,94 @@
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import date
+import os
 from pathlib import Path
-import pickle
+import threading
 import time
+from types import MappingProxyType
 
+import orjson
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
 from sleeper_wrapper import League, Players
 
+# One worker per regular season week, so a full season of matchups is fetched in one round-trip.
+_EXECUTOR = ThreadPoolExecutor(max_workers=18)
+# One long-lived event loop runs every matchup pull, whether or not the caller is already inside a loop.
+_LOOP = asyncio.new_event_loop()
+threading.Thread(target=_LOOP.run_forever, daemon=True).start()
+# Kept separate from _EXECUTOR, since the matchups prefetch itself waits on _EXECUTOR.
+_PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+# These roster settings don't exist in the preseason.
+_ROSTER_SETTING_DEFAULTS = {
+    'fpts_decimal': 0, 'fpts_against': 0, 'fpts_against_decimal': 0, 'ppts': 0, 'ppts_decimal': 0, 'record': ''
+}
+
+# Old player files only need clearing once a day, when the date in the filename rolls over.
+_last_cleanup_date: str = None
+
+# Player fields kept in the daily players cache, the rest of the Sleeper payload isn't used.
+PLAYER_COLUMNS = [
+    'player_id', 'full_name', 'first_name', 'last_name', 'position', 'fantasy_positions', 'team',
+    'status', 'injury_status', 'active', 'age', 'years_exp'
+]
+
+# Every Sleeper call shares one keep-alive session, with room for a connection per matchup week.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_maxsize=18))
+
+# Last validators and payload seen per url, so unchanged responses come back as a 304 instead of a full download.
+# Oldest entries are dropped past the limit, which still fits the league, rosters, users and matchups of several leagues.
+_RESPONSE_CACHE: dict = {}
+_RESPONSE_CACHE_SIZE = 128
+_RESPONSE_CACHE_LOCK = threading.Lock()
+
+def _conditional_get(url: str, use_cache: bool = True):
+    cached = _RESPONSE_CACHE.get(url) if use_cache else None
+    headers = {}
+    if cached is not None:
+        if cached['etag']: headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']: headers['If-Modified-Since'] = cached['last_modified']
+
+    response = _SESSION.get(url, headers=headers, timeout=10)
+    if response.status_code == 304 and cached is not None:
+        return cached['data']
+    response.raise_for_status()
+
+    data = orjson.loads(response.content)
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if use_cache and (etag or last_modified):
+        with _RESPONSE_CACHE_LOCK:
+            _RESPONSE_CACHE.pop(url, None)
+            _RESPONSE_CACHE[url] = {'etag': etag, 'last_modified': last_modified, 'data': data}
+            while len(_RESPONSE_CACHE) > _RESPONSE_CACHE_SIZE:
+                del _RESPONSE_CACHE[next(iter(_RESPONSE_CACHE))]
+    return data
+
+def _write_parquet(df: pd.DataFrame, path: Path, **kwargs) -> None:
+    """
+    Writes to a temporary file and renames it into place, so readers never see a partly written file.
+    """
+    tmp_file = path.with_name(f'.{path.name}.{os.getpid()}-{threading.get_ident()}.tmp')
+    try:
+        df.to_parquet(tmp_file, **kwargs)
+        os.replace(tmp_file, path)
+    finally:
+        tmp_file.unlink(missing_ok=True)
+
+class _ConditionalLeague(League):
+    def _call(self, url: str):
+        return _conditional_get(url)
+
+class _SessionPlayers(Players):
+    # The players payload is several MB and is already kept as the daily parquet file, so it isn't held in memory.
+    def _call(self, url: str):
+        return _conditional_get(url, use_cache=False)
+
 @dataclass
 class SleeperLeague:
     league_id: str
@@ -15,42 +97,40 @@ class SleeperLeague:
     current_week: int = field(init=False)
     sleeper_league: League = field(init=False)
 
-    league_info: dict = field(default_factory=dict)
-    players: dict = field(default_factory=dict)
-    rosters: dict = field(default_factory=dict)
-    users: dict = field(default_factory=dict)
-    matchups: dict = field(default_factory=dict)
+    # Pulled data is exposed read-only, since it's shared with the response cache and every analyzer built on it.
+    league_info: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    players: pd.DataFrame = None
+    rosters: tuple = ()
+    users: tuple = ()
+    matchups: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    _loaded: set = field(init=False, repr=False, default_factory=set)
+    _data_getters: dict = field(init=False, repr=False, default_factory=dict)
+    _prefetched: dict = field(init=False, repr=False, default_factory=dict)
 
     @property
     def league_description(self):
         return f'{self.name} ({self.season})'
 
     def __post_init__(self) -> None:
-        self.sleeper_league = League(self.league_id)
+        self.sleeper_league = _ConditionalLeague(self.league_id)
+        self._data_getters = {
+            'league': lambda: self.league_info,
+            'players': self._get_players,
+            'rosters': self._get_rosters,
+            'users': self._get_users,
+            'matchups': self._get_matchups,
+        }
         self._pull_league_data()
+        self._prefetch_data()
 
     def get_data(self, data: str) -> dict:
-        match data:
-            case 'league':
-                return self.league_info
-            case 'players':
-                return self._get_players()
-            case 'rosters':
-                if self.rosters == dict():
-                    self._pull_rosters()
-                return self.rosters
-            case 'users':
-                if self.users == dict():
-                    self._pull_users()
-                return self.users
-            case 'matchups':
-                if self.matchups == dict():
-                    self._pull_matchups()
-                return self.matchups
-            case _:
-                return {}
+        self._wait_for_prefetch(data)
+        getter = self._data_getters.get(data)
+        return getter() if getter else {}
     
     def refresh_data(self, data_to_refresh) -> None:
+        for data in data_to_refresh:
+            self._wait_for_prefetch(data)
         if 'league' in data_to_refresh:
             self._pull_league_data()
         if 'players' in data_to_refresh:
@@ -62,77 +142,133 @@ class SleeperLeague:
         if 'matchups' in data_to_refresh:
             self._pull_matchups()
 
-    def _get_players(self) -> dict:
+    def _prefetch_data(self) -> None:
         """
-        Checks if we have today's players already in a pickle file, otherwise pulls them
+        Starts pulling the remaining league data in the background, so it's ready by the time a page asks for it.
         """
-        if self.players == dict():
+        self._prefetched = {
+            'players': _PREFETCH_EXECUTOR.submit(self._get_players),
+            'rosters': _PREFETCH_EXECUTOR.submit(self._pull_rosters),
+            'users': _PREFETCH_EXECUTOR.submit(self._pull_users),
+            'matchups': _PREFETCH_EXECUTOR.submit(self._pull_matchups),
+        }
+
+    def _wait_for_prefetch(self, data: str) -> None:
+        # The future stays in place, so every thread sharing this league waits on the same pull instead of starting its own.
+        future = self._prefetched.get(data)
+        if future is None: return
+        try:
+            future.result()
+        except Exception:
+            # A failed prefetch is dropped, so the next request pulls the data itself.
+            if self._prefetched.get(data) is future: self._prefetched.pop(data, None)
+            raise
+
+    def _get_players(self) -> pd.DataFrame:
+        """
+        Checks if we have today's players already in a parquet file, otherwise pulls them
+        """
+        if self.players is None:
             current_players_file = self._get_players_filename()
             if current_players_file.is_file():
                 start_time = time.time()
                 print('Reading current players file.')
-                with open(current_players_file, 'rb') as f:
-                    self.players = pickle.load(f)
+                self.players = pd.read_parquet(current_players_file)
                 duration = time.time() - start_time
                 print(f'Reading took {duration:.2} seconds')
             else:
                 start_time = time.time()
                 self._pull_players()
-                with open(current_players_file, 'wb') as f:
-                    pickle.dump(self.players, f, protocol=pickle.HIGHEST_PROTOCOL)
+                _write_parquet(self.players, current_players_file, compression='zstd', index=False)
                 duration = time.time() - start_time
                 print(f'Pull and dump took {duration:.2} seconds')
         return self.players
     
+    def _get_rosters(self) -> tuple:
+        if 'rosters' not in self._loaded:
+            self._pull_rosters()
+        return self.rosters
+
+    def _get_users(self) -> tuple:
+        if 'users' not in self._loaded:
+            self._pull_users()
+        return self.users
+
+    def _get_matchups(self) -> MappingProxyType:
+        if 'matchups' not in self._loaded:
+            self._pull_matchups()
+        return self.matchups
+
     def _get_players_filename(self) -> Path:
+        global _last_cleanup_date
+
         today = date.today().strftime(f'%Y%m%d')
         data_folder = Path('.') / 'data'
         data_folder.mkdir(exist_ok=True)
-        current_players_file = f'sleeper_players_{today}.pickle'
-        self._clear_old_player_files(data_folder, current_players_file)
-        return data_folder / current_players_file
+        current_players_file = f'sleeper_players_{today}.parquet'
+        if _last_cleanup_date != today:
+            self._clear_old_player_files(data_folder, current_players_file)
+            _last_cleanup_date = today
+        # An empty file from a failed write is removed on every call, so today's players get pulled again.
+        current_players_path = data_folder / current_players_file
+        try:
+            if current_players_path.stat().st_size == 0: current_players_path.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+        return current_players_path
 
     def _clear_old_player_files(self, folder: Path, active_file: str) -> None:
-        for x in folder.glob('sleeper_players_*.*'):
-            if x.is_file() and x.name != active_file:
-                x.unlink()
-            if x.is_file() and x.name == active_file and x.stat().st_size == 0:
-                x.unlink()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.name.startswith('sleeper_players_') or not entry.is_file():
+                    continue
+                if entry.name != active_file:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
     
     def _pull_league_data(self) -> None:
         league_info = self.sleeper_league.get_league()
-        self.league_info = league_info
+        self.league_info = MappingProxyType(league_info)
         self.name = league_info.get('name', '')
         self.season = league_info.get('season', '')
         self.current_week = int(league_info.get('settings', {}).get('leg', 0))
         self.starting_positions = [pos for pos in league_info['roster_positions'] if pos != 'BN']
 
-        roster = list(set(self.starting_positions))
-        if ('DL' in roster) and ('LB' in roster): roster.insert(roster.index('LB'), 'DL/LB')
-        if ('LB' in roster) and ('CB' in roster): roster.insert(roster.index('LB'), 'LB/DB')
-        if 'FLEX' in roster: roster.remove('FLEX')
+        # Unique positions in league order, with the hybrid positions slotted in right before LB.
+        unique_positions = dict.fromkeys(self.starting_positions)
+        roster = []
+        for pos in unique_positions:
+            if pos == 'FLEX': continue
+            if pos == 'LB':
+                if 'DL' in unique_positions: roster.append('DL/LB')
+                if 'CB' in unique_positions: roster.append('LB/DB')
+            roster.append(pos)
         self.ordered_roster_positions = roster
 
     def _pull_players(self) -> None:
         print('Pulling players from Sleeper API.')
-        players = Players()
-        self.players = players.get_all_players()
+        players = _SessionPlayers()
+        players_dict = players.get_all_players()
+        self.players = pd.DataFrame.from_records(list(players_dict.values()), columns=PLAYER_COLUMNS)
     
     def _pull_rosters(self) -> None:
-        rosters_dict = self.sleeper_league.get_rosters()
-        for roster in rosters_dict:
-            # Replaces empty roster groups with empty list.
-            for roster_slot in ['starters', 'taxi', 'reserve']:
-                roster[roster_slot] = [] if roster.get(roster_slot) is None else roster[roster_slot]
-            # These roster variables don't exists in the preseason.
-            roster_settings = roster['settings']
-            for single_setting in ['fpts_decimal', 'fpts_against', 'fpts_against_decimal', 'ppts', 'ppts_decimal']:
-                if single_setting not in roster_settings: roster_settings[single_setting] = 0
-            if 'record' not in roster_settings: roster_settings['record'] = ''
-        self.rosters = rosters_dict
+        # Builds new roster dicts, rather than patching the ones held by the response cache.
+        self.rosters = tuple(
+            {**roster,
+             # Replaces empty roster groups with empty list.
+             'starters': roster.get('starters') or [],
+             'taxi': roster.get('taxi') or [],
+             'reserve': roster.get('reserve') or [],
+             'settings': _ROSTER_SETTING_DEFAULTS | roster['settings']}
+            for roster in self.sleeper_league.get_rosters()
+        )
+        self._loaded.add('rosters')
 
     def _pull_users(self) -> None:
-        self.users = self.sleeper_league.get_users()
+        self.users = tuple(self.sleeper_league.get_users())
+        self._loaded.add('users')
 
     def __pull_single_week_mathcup__(self, week: int) -> dict:
         return self.sleeper_league.get_matchups(week)
@@ -140,18 +276,11 @@ class SleeperLeague:
     async def __pull_matchups_async(self) -> dict:
         weeks = range(1, self.current_week + 1)
         loop = asyncio.get_running_loop()
-        futures = [loop.run_in_executor(None, self.__pull_single_week_mathcup__, i)  for i in weeks]
+        futures = [loop.run_in_executor(_EXECUTOR, self.__pull_single_week_mathcup__, i) for i in weeks]
         matchups = await asyncio.gather(*futures)
         return dict(zip(weeks, matchups))
 
     def _pull_matchups(self) -> None:
-        # self.matchups = asyncio.run(self.__pull_matchups_async())
-        if asyncio._get_running_loop() is None:
-            print('Pulling matchups async.')
-            self.matchups = asyncio.run(self.__pull_matchups_async())
-        else:
-            print('Pulling matchups non-async.')
-            self._pull_matchups_nonasync()
-
-    def _pull_matchups_nonasync(self) -> None:
-        self.matchups = {week: self.sleeper_league.get_matchups(week) for week in range(1, self.current_week + 1)}
\ No newline at end of file
+        matchups = asyncio.run_coroutine_threadsafe(self.__pull_matchups_async(), _LOOP).result()
+        self.matchups = MappingProxyType(matchups)
+        self._loaded.add('matchups')
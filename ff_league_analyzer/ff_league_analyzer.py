@@ -1,118 +1,168 @@
-from collections import Counter
 from dataclasses import dataclass, field
+from functools import cached_property
+import hashlib
+from pathlib import Path
+import orjson
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import time
 
-from typing import Tuple
-from .ff_league import SleeperLeague
-
-def _get_roster_spot(roster: pd.Series) -> str:
-    player_id = roster.player_id
-    if player_id in roster.starters: return 'starter'
-    if player_id in roster.taxi: return 'taxi'
-    if player_id in roster.reserve: return 'ir'
-    return 'bench'
+from .ff_helpers import expand_to_str_columns, fantasy_pos_label
+from .ff_league import SleeperLeague, _write_parquet
+
+_ROSTER_SPOT_DTYPE = pd.CategoricalDtype(['starter', 'taxi', 'ir', 'bench'])
+
+def _get_roster_spots(df: pd.DataFrame, rosters: tuple) -> pd.Categorical:
+    """
+    Classifies every (roster_id, player_id) row as starter, taxi, ir or bench.
+    """
+    roster_players = pd.MultiIndex.from_frame(df[['roster_id', 'player_id']])
+    in_slot = [
+        roster_players.isin([(roster['roster_id'], player) for roster in rosters for player in roster[slot]])
+        for slot in ['starters', 'taxi', 'reserve']
+    ]
+    # Codes index straight into _ROSTER_SPOT_DTYPE, so no strings are built or hashed.
+    codes = np.select(in_slot, [0, 1, 2], default=3).astype(np.int8)
+    return pd.Categorical.from_codes(codes, dtype=_ROSTER_SPOT_DTYPE)
+
+# Bump whenever a cached frame's columns or dtypes change, so files written by older code aren't read back.
+_CACHE_VERSION = 1
+
+def _cache_key(sources) -> str:
+    """
+    Short content hash of the raw data a DataFrame is built from, plus the cache layout version.
+    """
+    raw = orjson.dumps((_CACHE_VERSION, sources), default=dict, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+def _format_record(wins: pd.Series, losses: pd.Series, ties: pd.Series) -> np.ndarray:
+    """
+    Joins wins, losses and ties into 'W-L-T' strings in one pass over the numeric arrays.
+    """
+    record = np.char.add(wins.to_numpy().astype('U'), '-')
+    record = np.char.add(np.char.add(record, losses.to_numpy().astype('U')), '-')
+    return np.char.add(record, ties.to_numpy().astype('U'))
 
 @dataclass
 class SleeperLeagueAnalyzer:
     league_id: str
     league: SleeperLeague = field(init=False)
-    _matchups: pd.DataFrame = field(init=False)
-    _players: pd.DataFrame = field(init=False)
-    _rosters: pd.DataFrame = field(init=False)
-    _teams: pd.DataFrame = field(init=False)
-    _users: pd.DataFrame = field(init=False)
     _data_frames: dict = field(init=False, default_factory=dict)
     _figures: dict = field(init=False, default_factory=dict)
+    _start_cols: list = field(init=False, default_factory=list)
+    _start_pos_labels: np.ndarray = field(init=False, default=None)
+    _start_slot_cols: tuple = field(init=False, default=())
+    _start_pos_order: tuple = field(init=False, default=())
+    _pos_order: tuple = field(init=False, default=())
     
     # _ordered_roster_positions = ('QB', 'RB', 'WR', 'TE', 'K', 'DEF', 'DL', 'DL/LB', 'LB', 'DB/LB', 'DB')
 
     def __post_init__(self):
         self.league = SleeperLeague(self.league_id)
-        self._matchups = None
-        self._players = None
-        self._rosters = None
-        self._teams = None
-        self._users = None
+        # Column names for the league's positions, shared by every week's roster distribution.
+        self._start_slot_cols = tuple('start_' + pos.lower() for pos in self.league.starting_positions)
+        self._start_pos_order = tuple(dict.fromkeys(self._start_slot_cols))
+        self._pos_order = tuple(pos.lower() + '_score' for pos in self.league.ordered_roster_positions)
 
-    @property
+    @cached_property
     def df_matchups(self) -> pd.DataFrame:
-        if self._matchups is None:
-            self.build_matchups_df()
-            pass
-        return self._matchups
-    
-    @property
+        return self.build_matchups_df()
+
+    @cached_property
     def df_players(self) -> pd.DataFrame:
-        if self._players is None: 
-            return self.build_players_df()
-        return self._players
+        return self.build_players_df()
 
-    @property
+    @cached_property
     def df_rosters(self) -> pd.DataFrame:
-        if self._rosters is None:
-            self.build_rosters_df()
-            pass
-        return self._rosters
+        return self.build_rosters_df()
 
-    @property
+    @cached_property
     def df_teams(self) -> pd.DataFrame:
-        if self._teams is None:
-            self.build_teams_df()
-            pass
-        return self._teams
+        return self.build_teams_df()
 
-    @property
+    @cached_property
     def df_users(self) -> pd.DataFrame:
-        if self._users is None:
-            self.build_users_df()
-            pass
-        return self._users
+        return self.build_users_df()
 
     @property
     def league_info(self) -> str:
         return self.league.league_description
 
-    def _roster_distribution(self, week: pd.DataFrame) -> Counter:
-        player_pos_map = dict(zip(self.df_players.player_id, self.df_players.fantasy_pos))
-
-        starters = set(week.starters)
-        bench_points = 0
-        valid_starters = 0
-        for player, points in week.players_points.items():
-            if player not in starters:
-                bench_points += points
-            elif points > 0:
-                valid_starters += 1
-        
+    # Raw league data is pulled once per analyzer, so every DataFrame is built from the same snapshot.
+    @cached_property
+    def _raw_matchups(self) -> dict:
+        return self.league.get_data('matchups')
+
+    @cached_property
+    def _raw_players(self) -> pd.DataFrame:
+        return self.league.get_data('players')
+
+    @cached_property
+    def _raw_rosters(self) -> tuple:
+        return self.league.get_data('rosters')
+
+    @cached_property
+    def _team_user_lookup(self) -> pd.DataFrame:
+        """
+        Teams joined with their owners once, for every table that needs team and user columns together.
+        """
+        return self.df_teams.merge(self.df_users.rename(columns={'user_id': 'owner_id'}), 
+                                   on='owner_id', how='left', validate='one_to_one')
+
+    @cached_property
+    def _player_pos_map(self) -> dict:
+        return dict(zip(self.df_players.player_id.to_numpy(), self.df_players.fantasy_pos.to_numpy()))
+
+    def _roster_distribution(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Builds bench points, active starters, points by starting slot and points by position for every matchup row.
+        """
+        player_pos_map = self._player_pos_map
         ignore_players = ['0']
-        start_pos_order = [pos.lower() for pos in pd.unique(self.league.starting_positions).tolist()]
-        pos_order = [pos.lower() for pos in self.league.ordered_roster_positions]
-        # start_pos = Counter({'start_' + pos: 0 for pos in start_pos_order})
-        # roster_pos = Counter({'roster_' + pos: 0 for pos in pos_order})
-        starters_score = Counter({'start_' + pos: 0 for pos in start_pos_order})
-        pos_score = Counter({pos + '_score': 0 for pos in pos_order})
-        
-        roster_stats = Counter({'bench_points': bench_points, 'active_starters': valid_starters})
-        for pos, score in zip(self.league.starting_positions, week.starters_points):
-            starters_score.update({('start_' + pos.lower()): score})
-        # start_pos.update(Counter(['start_' + player_pos_map.get(starter, '').lower() for starter in starters if starter not in ignore_players]))
-        # roster_pos.update(Counter(['roster_' + player_pos_map.get(player, '').lower() for player in week.players if player not in ignore_players]))
-        pos_scores = [(player_pos_map.get(player,'').lower() + '_score', score)
-                          for player, score in week.players_points.items()
-                          if (player not in ignore_players)]
-        pos_score.update(pd.DataFrame(pos_scores, columns=['player', 'score']).groupby('player').score.sum().to_dict())
-        
-        return_counter = Counter()
-        return_counter.update(roster_stats)
-        return_counter.update(starters_score)
-        # return_counter.update(start_pos)
-        # return_counter.update(roster_pos)
-        return_counter.update(pos_score)
-        return return_counter
+        start_pos_order = list(self._start_pos_order)
+        pos_order = list(self._pos_order)
+        n_rows = len(df)
+
+        # Flat arrays with one entry per player and one per starting slot, keyed by the matchup row's position.
+        players = [(row, player, points)
+                   for row, players_points in enumerate(df.players_points)
+                   for player, points in players_points.items()]
+        p_rows = np.array([row for row, _, _ in players], dtype=np.int64)
+        p_ids = pd.Index([player for _, player, _ in players], dtype=object)
+        p_points = np.array([points for _, _, points in players], dtype=np.float64)
+        slot_codes = [start_pos_order.index(col) for col in self._start_slot_cols]
+        starters = [(row, player, slot, points)
+                    for row, (row_starters, starters_points) in enumerate(zip(df.starters, df.starters_points))
+                    for player, slot, points in zip(row_starters, slot_codes, starters_points)]
+        s_rows = np.array([row for row, _, _, _ in starters], dtype=np.int64)
+        s_slots = np.array([slot for _, _, slot, _ in starters], dtype=np.int64)
+        s_points = np.array([points for _, _, _, points in starters], dtype=np.float64)
+        is_starter = (
+            pd.MultiIndex.from_arrays([p_rows, p_ids])
+            .isin(pd.MultiIndex.from_arrays([s_rows, pd.Index([player for _, player, _, _ in starters], dtype=object)]))
+        )
+
+        # Every total is a weighted bincount over (row, column) codes, so each sum is one pass in C.
+        bench_points = np.bincount(p_rows, weights=np.where(is_starter, 0, p_points), minlength=n_rows)
+        active_starters = np.bincount(p_rows[is_starter & (p_points > 0)], minlength=n_rows)
+        starters_score = np.bincount(s_rows * len(start_pos_order) + s_slots, weights=s_points,
+                                     minlength=n_rows * len(start_pos_order)).reshape(n_rows, len(start_pos_order))
+
+        scored = ~p_ids.isin(ignore_players)
+        pos_labels = p_ids[scored].map(player_pos_map).fillna('').str.lower() + '_score'
+        pos_codes, pos_uniques = pd.factorize(pos_labels)
+        pos_cols = pos_order + sorted(col for col in pos_uniques if col not in pos_order)
+        pos_codes = pd.Index(pos_cols).get_indexer(pos_uniques)[pos_codes]
+        pos_score = np.bincount(p_rows[scored] * len(pos_cols) + pos_codes, weights=p_points[scored],
+                                minlength=n_rows * len(pos_cols)).reshape(n_rows, len(pos_cols))
+
+        return pd.concat([
+            pd.DataFrame({'bench_points': bench_points, 'active_starters': active_starters.astype(np.int64)}, index=df.index),
+            pd.DataFrame(starters_score, index=df.index, columns=start_pos_order),
+            pd.DataFrame(pos_score, index=df.index, columns=pos_cols),
+        ], axis=1)
 
     def _adjust_weekly_data_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         start_columns = ['roster_id', 'week', 'matchup_id', 'points', 'bench_points', 'active_starters']
@@ -121,154 +171,166 @@ class SleeperLeagueAnalyzer:
         df = df[new_column_order]
         return df
 
+    def _get_cache_file(self, name: str, sources) -> Path:
+        """
+        Parquet file for a DataFrame built from the given raw data, clearing files built from older data.
+        """
+        cache_folder = Path('.') / 'data' / self.league_id
+        cache_folder.mkdir(parents=True, exist_ok=True)
+        cache_file = cache_folder / f'{name}-{_cache_key(sources)}.parquet'
+        for old_file in cache_folder.glob(f'{name}-*.parquet'):
+            # Another worker may have already removed it.
+            if old_file != cache_file: old_file.unlink(missing_ok=True)
+        return cache_file
+
     def build_matchups_df(self) -> pd.DataFrame:
         start_time = time.time()
-        matchups_dict = self.league.get_data('matchups')
+        matchups_dict = self._raw_matchups
         duration = time.time() - start_time
         print(f'Get matchups dict in {duration:.2} seconds.')
-        df_list = []
-        for week, week_dict in matchups_dict.items():
-            df_week = (
-                pd.DataFrame(week_dict)
-                .assign(week = week,
-                        matchup_id = lambda df: df.matchup_id.fillna(-1).astype(np.int8))
-                .pipe(lambda df: df.assign(**pd.DataFrame(df.apply(self._roster_distribution, axis=1).tolist())))
-                .pipe(self._adjust_weekly_data_columns)
-            )
-            df_list.append(df_week)
-        df_scores = pd.concat(df_list).reset_index(drop=True)
+        cache_file = self._get_cache_file('matchups', (matchups_dict, self.league.starting_positions, 
+                                                       self.league.ordered_roster_positions, self._player_pos_map))
+        if cache_file.is_file():
+            df = pd.read_parquet(cache_file)
+        else:
+            df = self._combine_weekly_matchups(matchups_dict)
+            _write_parquet(df, cache_file, compression='zstd')
+        self._start_cols = [col for col in df.columns if col.startswith('start_')]
+        self._start_pos_labels = np.array([col.removeprefix('start_').upper() for col in self._start_cols], dtype=object)
+        return df
+
+    def _combine_weekly_matchups(self, matchups_dict: dict) -> pd.DataFrame:
+        # Every week's rows go into one frame, so the roster distribution and column reorder run once.
+        df_scores = (
+            pd.DataFrame([dict(row, week=week) for week, week_dict in matchups_dict.items() for row in week_dict])
+            .assign(matchup_id = lambda df: df.matchup_id.fillna(-1).astype(np.int8))
+            .pipe(lambda df: df.join(self._roster_distribution(df)))
+            .pipe(self._adjust_weekly_data_columns)
+        )
+        # Each matchup is a pair of rows, so the opponent is whichever row of the pair isn't this one.
+        matchup_pairs = df_scores.groupby(['week', 'matchup_id'])[['roster_id', 'points']]
+        opponents = matchup_pairs.shift(-1).fillna(matchup_pairs.shift(1))
+        # A matchup_id with only one row has no opponent, the same as a bye.
+        no_opponent = (df_scores.matchup_id == -1) | opponents.roster_id.isna()
         df = (
-            df_scores        
-            .merge(df_scores[['week', 'matchup_id', 'roster_id', 'points']], on=['week', 'matchup_id'], suffixes=('', '_opp'), how='left')
-            .rename(columns={'roster_id_opp': 'opponent_id', 'points_opp': 'opp_points'})
-            .query('roster_id != opponent_id')
-            .assign(result = lambda df: np.select([df.matchup_id == -1,
+            df_scores
+            .assign(opponent_id = np.where(no_opponent, -1, opponents.roster_id),
+                    opp_points = np.where(no_opponent, 0, opponents.points))
+            .astype({'opponent_id': np.int64})
+            .assign(result = lambda df: np.select([df.opponent_id == -1,
                                                 df.points > df.opp_points, 
                                                 df.points == df.opp_points, 
                                                 df.points < df.opp_points],
-                                                ['No matchup', 'Win', 'Tie', 'Loss']),
-                    opponent_id = lambda df: np.where(df.matchup_id == -1, -1, df.opponent_id),
-                    opp_points = lambda df: np.where(df.matchup_id == -1, 0, df.opp_points))
+                                                ['No matchup', 'Win', 'Tie', 'Loss']))
         )
-        self._matchups = df
         return df
 
     @staticmethod
-    def _clean_player_info(player_info: dict) -> dict:
-        ignore_keys = {
-            'espn_id', 'fantasy_data_id', 'gsis_id', 'pandascore_id', 'rotowire_id', 'rotoworld_id', 
-            'sleeper_id', 'sportradar_id', 'stats_id', 'swish_id', 'yahoo_id', 
-            'high_school', 'college',
-            'birth_city', 'birth_country', 'birth_date', 'birth_state', 
-            'hashtag', 'height', 'injury_body_part', 'injury_notes', 'injury_start_date', 
-            'news_updated', 'number',
-            'practice_description', 'practice_participation', 
-            'search_full_name', 'search_first_name', 'search_last_name', 'search_rank', 'sport', 
-            'weight'
-        }
-        cleaned_player_info = {k: v for k,v in player_info.items() if k not in ignore_keys}
-        return cleaned_player_info
-
-    @staticmethod
-    def _drop_unused_positions(positions: list) -> list:
-        positions = [pos for pos in positions if pos[0] != 'O']
-        
-        if 'LEO' in positions: positions.remove('LEO')
-        if 'LS' in positions: positions.remove('LS')
-        if 'P' in positions: positions.remove('P')
-            
-        return sorted(positions)
+    def _format_fantasy_pos(positions) -> str:
+        """
+        Joins a player's fantasy positions into one label, dropping offensive line and special teams spots.
+        """
+        if not isinstance(positions, (list, np.ndarray)): return ''
+        return fantasy_pos_label(tuple(positions))
 
     def build_players_df(self) -> pd.DataFrame:
-        players_dict = self.league.get_data('players')
+        players = self._raw_players
         start_time = time.time()
-        players_cleaned = {player: self._clean_player_info(player_info) 
-                            for player, player_info 
-                            in players_dict.items() 
-                            if player_info.get('active')}
         df = (
-            pd.DataFrame(players_cleaned)
-            .T
-            .rename_axis('sleeper_id')
-            .reset_index()
-            # .drop(columns=['hashtag', 'news_updated', 'sport',
-            #                'sleeper_id', 'pandascore_id', 'rotowire_id', 'espn_id', 'yahoo_id', 
-            #                'sportradar_id', 'stats_id', 'fantasy_data_id', 'swish_id', 'gsis_id', 'rotoworld_id',
-            #                'birth_date', 'birth_city', 'birth_state', 'birth_country', 
-            #                'height', 'weight', 'high_school', 'college',
-            #                'search_first_name', 'search_last_name', 'search_full_name'])
-            .assign(fantasy_positions = lambda df: df.fantasy_positions.apply(lambda d: d if isinstance(d, list) else []),
-                    fantasy_pos = lambda df: df.fantasy_positions.apply(list).apply(self._drop_unused_positions).apply('/'.join),
-                    active = lambda df: df.active.fillna('False').astype(bool)
+            players
+            .assign(fantasy_pos = lambda df: [self._format_fantasy_pos(positions) for positions in df.fantasy_positions],
+                    active = lambda df: df.active.fillna(False).astype(bool)
                     )
-            .query('(fantasy_pos != "") and active')
+            .loc[lambda df: (df.fantasy_pos.to_numpy() != '') & df.active.to_numpy(dtype=bool)]
             .drop(columns=['fantasy_positions', 'active'])
+            .astype({'player_id': 'category', 'fantasy_pos': 'category'})
         )
         duration = time.time() - start_time
         print(f'Player DF build took {duration:.2} seconds')
-        self._players = df
         return df
 
     def build_rosters_df(self) -> pd.DataFrame:
-        rosters_dict = self.league.get_data('rosters')
-        df_starters = (
-            pd.DataFrame([(roster['owner_id'], roster['starters'])for roster in rosters_dict], columns=['owner_id', 'player_id'])
-            .explode('player_id')
-            .assign(starting_pos = lambda df: self.league.starting_positions * df.owner_id.nunique())
-        )
+        rosters_dict = self._raw_rosters
+        cache_file = self._get_cache_file('rosters', (rosters_dict, self.league.starting_positions))
+        if cache_file.is_file():
+            return pd.read_parquet(cache_file)
+        # Starters line up with the league's starting slots, so each one is paired with its slot directly.
+        df_starters = pd.DataFrame.from_records(
+            [(roster['owner_id'], player, pos)
+             for roster in rosters_dict
+             for player, pos in zip(roster['starters'], self.league.starting_positions)],
+            columns=['owner_id', 'player_id', 'starting_pos'])
+        starting_pos_dtype = pd.CategoricalDtype(list(dict.fromkeys(self.league.starting_positions)) + ['NA'])
         df = (
             pd.DataFrame(rosters_dict)
             .drop(columns=['player_map', 'metadata', 'co_owners', 'settings'])
             .explode('players')
             .rename(columns={'players': 'player_id'})
             .merge(df_starters, on=['owner_id', 'player_id'], how='left')
-            .assign(roster_spot = lambda df: df.apply(_get_roster_spot, axis=1).astype('category'),
-                    starting_pos = lambda df: df.starting_pos.fillna('NA').astype('category'))
+            .assign(roster_spot = lambda df: _get_roster_spots(df, rosters_dict),
+                    starting_pos = lambda df: df.starting_pos.fillna('NA').astype(starting_pos_dtype))
             .drop(columns=['taxi', 'starters', 'reserve'])
-            .astype({'owner_id': np.int64})
+            .astype({'owner_id': np.int64, 'player_id': 'category'})
             [['owner_id' ,'roster_id', 'player_id', 'roster_spot', 'starting_pos']]
             )
-        self._rosters = df
+        _write_parquet(df, cache_file, compression='zstd')
         return df
 
+    @staticmethod
+    def _count_roster_slots(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Counts rostered, starter, taxi and ir players for every roster in a single pass over the slot lists.
+        """
+        counts = np.array(
+            [(len(p), len(s), len(t), len(r)) for p, s, t, r in zip(df.players, df.starters, df.taxi, df.reserve)],
+            dtype=np.int8
+        ).reshape(-1, 4)
+        return pd.DataFrame(counts, index=df.index, columns=['rostered', 'starters', 'taxi', 'ir'])
+
     def build_teams_df(self) -> pd.DataFrame:
-        rosters_dict = self.league.get_data('rosters')
+        rosters_dict = self._raw_rosters
+        cache_file = self._get_cache_file('teams', rosters_dict)
+        if cache_file.is_file():
+            return pd.read_parquet(cache_file)
         df = (
             pd.DataFrame(rosters_dict)
             .astype({'owner_id': np.int64})
-            .pipe(lambda df: df.assign(**df.settings.apply(pd.Series, dtype='str')))
-            .pipe(lambda df: df.assign(**df.metadata.apply(pd.Series, dtype='str')))
+            .pipe(lambda df: df.assign(**expand_to_str_columns(df.settings)))
+            .pipe(lambda df: df.assign(**expand_to_str_columns(df.metadata)))
             .astype({'fpts': np.int64, 'fpts_decimal': np.int64, 'fpts_against': np.int64, 'fpts_against_decimal': np.int64, 
                      'ppts': np.int64, 'ppts_decimal': np.int64})
             .drop(columns=['settings', 'metadata'])
-            .assign(points_for = lambda df: df.fpts + (df.fpts_decimal / 100),
-                    points_against = lambda df: df.fpts_against + (df.fpts_against_decimal / 100),
-                    possible_points = lambda df: df.ppts + (df.ppts_decimal / 100),
-                    rostered = lambda df: df.players.apply(len).astype(np.int8),
-                    starters = lambda df: df.starters.apply(len).astype(np.int8),
-                    taxi = lambda df: df.taxi.apply(len).astype(np.int8),
-                    ir = lambda df: df.reserve.apply(len).astype(np.int8),
-                    bench = lambda df: (df.rostered - df.starters - df.taxi - df.ir).astype(np.int8),
+            .pipe(lambda df: df.assign(**self._count_roster_slots(df)))
+            .eval('''
+                  points_for = fpts + fpts_decimal / 100
+                  points_against = fpts_against + fpts_against_decimal / 100
+                  possible_points = ppts + ppts_decimal / 100
+                  ''')
+            .assign(bench = lambda df: (df.rostered - df.starters - df.taxi - df.ir).astype(np.int8),
                     roster_locked = lambda df: (df.starters + df.bench > 40).astype(np.int8))
             [['owner_id', 'roster_id', 'division', 
               'wins', 'losses', 'ties', 
               'points_for', 'points_against', 'possible_points', 'record',
               'rostered', 'starters', 'bench', 'ir', 'taxi', 'roster_locked']]
         )
-        self._teams = df
+        _write_parquet(df, cache_file, compression='zstd')
         return df
 
     def build_users_df(self) -> pd.DataFrame:
         users_dict = self.league.get_data('users')
+        cache_file = self._get_cache_file('users', users_dict)
+        if cache_file.is_file():
+            return pd.read_parquet(cache_file)
         df = (
             pd.DataFrame(users_dict)
-            .assign(team_name = lambda df: [d.get('team_name') for d in df.metadata],
-                    is_commish = lambda df: df.is_owner.fillna(False).astype(np.int8))
-            .assign(team_name = lambda df: np.where(df.team_name.isna(), 'Team ' + df.display_name, df.team_name))
+            .assign(team_name = lambda df: (
+                        pd.Series([d.get('team_name') for d in df.metadata], index=df.index, dtype='string[pyarrow]')
+                        .fillna(('Team ' + df.display_name).astype('string[pyarrow]'))),
+                    is_commish = lambda df: df.is_owner.fillna(False).to_numpy(dtype=np.int8))
             .astype({'user_id': np.int64})
             [['user_id', 'team_name', 'display_name', 'is_commish']]
             )
-        self._users = df
+        _write_parquet(df, cache_file, compression='zstd')
         return df
 
     def _sort_roster_distribution_columns(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -281,36 +343,47 @@ class SleeperLeagueAnalyzer:
         if 'roster-distribution' in self._data_frames:
             return self._data_frames['roster-distribution']
 
-        users = self.df_users
-        teams = self.df_teams
+        team_users = self._team_user_lookup
         rosters = self.df_rosters
         players = self.df_players
 
+        # Rostered players share the rosters' player categories, so the merge compares category codes.
+        player_pos = (
+            players.loc[players.player_id.isin(rosters.player_id), ['player_id', 'fantasy_pos']]
+            .astype({'player_id': rosters.player_id.dtype})
+        )
         df = (
             rosters
-            .merge(players[['player_id', 'fantasy_pos']], on='player_id', how='left')
-            .groupby(['owner_id', 'fantasy_pos'], as_index=False)
+            .merge(player_pos, on='player_id', how='left', validate='many_to_one')
+            .groupby(['owner_id', 'fantasy_pos'], observed=True)
             .size()
-            .pivot_table(index='owner_id', columns='fantasy_pos', values='size', fill_value=0)
+            .unstack(fill_value=0)
             .reset_index()
-            .merge(users.rename(columns={'user_id': 'owner_id'})[['owner_id', 'team_name', 'display_name']], 
-                   on='owner_id', how='left')
-            .merge(teams[['owner_id', 'wins', 'losses', 'ties']], on='owner_id', how='left')
-            .assign(record = lambda df: df.wins.astype(str) + '-' + df.losses.astype(str) + '-' + df.ties.astype(str))
+            .merge(team_users[['owner_id', 'team_name', 'display_name', 'wins', 'losses', 'ties']], 
+                   on='owner_id', how='left', validate='one_to_one')
+            .assign(record = lambda df: _format_record(df.wins, df.losses, df.ties))
             .pipe(self._sort_roster_distribution_columns)
         )
         self._data_frames['roster-distribution'] = df
         return df
 
+    def get_roster_distribution_thresholds(self) -> pd.Series:
+        """
+        90th percentile of every numeric roster distribution column, used to highlight the top teams.
+        """
+        if 'roster-distribution-thresholds' in self._data_frames:
+            return self._data_frames['roster-distribution-thresholds']
+
+        thresholds = self.get_roster_distribution().select_dtypes('number').quantile(0.9)
+        self._data_frames['roster-distribution-thresholds'] = thresholds
+        return thresholds
+
     def get_general_team_data(self) -> pd.DataFrame:
         if 'team-general' in self._data_frames:
             return self._data_frames['team-general']
 
-        users = self.df_users
-        teams = self.df_teams
         df = (
-            teams
-            .merge(users.rename(columns={'user_id': 'owner_id'}), on='owner_id', how='left')
+            self._team_user_lookup
             [['team_name', 'display_name', 'wins', 'losses', 'ties', 'points_for', 'points_against', 'rostered']]
             .sort_values(['points_for', 'points_against'], ascending=False)
         )
@@ -322,20 +395,20 @@ class SleeperLeagueAnalyzer:
             return self._data_frames['weekly_scoring']
 
         matchups = self.df_matchups
-        users = self.df_users
-        teams = self.df_teams
+        team_users = self._team_user_lookup
         start_time = time.time()
+        # One row per (matchup row, starting slot), laid out straight from the start_* columns.
+        start_points = matchups[self._start_cols].to_numpy()
+        n_pos = len(self._start_cols)
         df = (
-            matchups
-            .assign(week_score = lambda df: df.filter(like='start_', axis=1).sum(axis=1))
-            .melt(id_vars=['roster_id', 'week', 'week_score'], 
-                value_vars=[col for col in matchups.columns if 'start_' in col], 
-                var_name='pos', 
-                value_name='start_points')
-            .assign(pos = lambda df: df.pos.str.replace('start_', '').str.upper())
-            .merge(teams[['owner_id', 'roster_id']], on='roster_id', how='left')
-            .merge(users.rename(columns={'user_id': 'owner_id'})[['owner_id', 'team_name']], 
-                on='owner_id', how='left')
+            pd.DataFrame({
+                'roster_id': np.repeat(matchups.roster_id.to_numpy(), n_pos),
+                'week': np.repeat(matchups.week.to_numpy(), n_pos),
+                'week_score': np.repeat(start_points.sum(axis=1), n_pos),
+                'pos': np.tile(self._start_pos_labels, len(matchups)),
+                'start_points': start_points.ravel(),
+            })
+            .merge(team_users[['roster_id', 'owner_id', 'team_name']], on='roster_id', how='left', validate='many_to_one')
             .sort_values(['week', 'week_score', 'roster_id'])
         )
         duration = time.time() - start_time
@@ -373,11 +446,13 @@ class SleeperLeagueAnalyzer:
         fig = go.Figure(
             layout_yaxis_range=[0, round(df.week_score.max() + 10, 1)],
         )
+        # One grouped pass splits the frame by team, instead of a full-frame query per team.
+        team_frames = dict(list(df.groupby('team_name', sort=False)))
         for team in reversed(df.team_name.unique().tolist()):
-            dff = df.query('team_name == @team')
+            dff = team_frames[team]
             fig.add_trace(go.Scatter(
-                x=dff.week,
-                y=dff.week_score,
+                x=dff.week.to_numpy(),
+                y=dff.week_score.to_numpy(),
                 mode='lines',
                 name=team,
                 hovertemplate= f'<b>{team}' + '</b><br><br>Week: %{x}<br>Score: %{y}<extra></extra>',
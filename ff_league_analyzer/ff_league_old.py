@@ -2,17 +2,23 @@ import pandas as pd
 import numpy as np
 
 from pathlib import Path
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import time
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Protocol, Tuple
 
+from ff_helpers import expand_to_str_columns, fantasy_pos_label
 from ff_user import FantasyFootballUser
 # from ff_roster import FantasyFootballRoster
 from sleeper_wrapper import League
 
-@dataclass
-class FantasyFootballLeague(Protocol):
+# A plain slotted dataclass, so subclasses get the generated __init__ (a Protocol base replaces it with a no-op).
+@dataclass(slots=True)
+class FantasyFootballLeague:
     name: str
     year: int
     host: str
@@ -22,6 +28,8 @@ class FantasyFootballLeague(Protocol):
     dfs: dict = field(default_factory=dict)
 
     positions_sort = ['QB', 'RB', 'RB/WR', 'WR', 'TE', 'K', 'DEF', 'DL', 'DL/LB', 'LB', 'DB/LB', 'DB']
+    # League data files older than this are pulled again from the API.
+    datafile_ttl_seconds = 10 * 60
   
     def set_datafiles(self, datapath: Path, file_dict: dict) -> None:
         if datapath.is_dir():
@@ -31,6 +39,9 @@ class FantasyFootballLeague(Protocol):
 
         for k, v in file_dict.items():
             self.files[k] = datapath / v
+        # League data is cached per league, so leagues sharing a datapath never read each other's files.
+        for k in ['users', 'rosters', 'teams']:
+            self.files.setdefault(k, datapath / f'{self.league_id}_{k}.parquet')
 
     def get_league_users(self, refresh: bool) -> list[FantasyFootballUser]:
         ...
@@ -41,21 +52,92 @@ class FantasyFootballLeague(Protocol):
             raise ValueError(f'The datafile for <{filetype}> isn\'t set.')
         return datafile
 
+    def _is_datafile_fresh(self, filetype: str) -> bool:
+        datafile = self.files.get(filetype)
+        if datafile is None or not datafile.is_file(): return False
+        return (time.time() - datafile.stat().st_mtime) < self.datafile_ttl_seconds
+
+    def _save_datafile(self, filetype: str, df: pd.DataFrame) -> None:
+        datafile = self.files.get(filetype)
+        if datafile is not None: df.to_parquet(datafile, compression='zstd')
+
 class SleeperLeague(FantasyFootballLeague):
     
     def __init__(self, name: str, year: int, league_id: int) -> None:
         super().__init__(name, year, 'Sleeper', league_id)
-        self._build_league_info()
+        self._session = SleeperLeague._new_session()
+        self._prefetched_json = {}
+        # League info is pulled on first use, or together with everything else by prefetch_all.
+        self._roster_positions = None
+
+    @property
+    def roster_positions(self) -> list:
+        if self._roster_positions is None:
+            self._build_league_info()
+        return self._roster_positions
+
+    @staticmethod
+    def _new_session() -> requests.Session:
+        """
+        Keep-alive session shared by every Sleeper call of the league, retrying transient failures.
+        """
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4, 
+                                              max_retries=Retry(total=3, backoff_factor=0.3)))
+        return session
+
+    def _api_url(self, data: str) -> str:
+        if data == 'players': return 'https://api.sleeper.app/v1/players/nfl'
+        if data == 'league': return f'https://api.sleeper.app/v1/league/{self.league_id}'
+        return f'https://api.sleeper.app/v1/league/{self.league_id}/{data}'
+
+    def _get_json(self, url: str):
+        """
+        Returns the response prefetched for the url if there is one, otherwise calls the Sleeper API.
+        """
+        payload = self._prefetched_json.pop(url, None)
+        if payload is None:
+            payload = self._fetch_json(url)
+        return payload
+
+    def _fetch_json(self, url: str):
+        response = self._session.get(url, timeout=10)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    def prefetch_all(self, refresh: bool = False) -> None:
+        """
+        Pulls every endpoint the league doesn't have cached yet in parallel, then builds the dataframes from them.
+        """
+        needed = []
+        if refresh or self._roster_positions is None:
+            needed.append('league')
+        if refresh or (self.dfs.get('users') is None and not self._is_datafile_fresh('users')):
+            needed.append('users')
+        if refresh or (self.dfs.get('rosters') is None and 
+                       not (self._is_datafile_fresh('rosters') and self._is_datafile_fresh('teams'))):
+            needed.append('rosters')
+        players_file = self.files.get('players')
+        if players_file is not None and (refresh or (self.dfs.get('players') is None and not players_file.is_file())):
+            needed.append('players')
+
+        urls = [self._api_url(data) for data in needed]
+        if urls:
+            with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+                self._prefetched_json.update(zip(urls, executor.map(self._fetch_json, urls)))
+
+        if 'league' in needed: self._build_league_info()
+        self.get_league_users(refresh)
+        self.get_league_rosters(refresh)
+        if players_file is not None: self.get_league_players(refresh)
 
     def _build_league_info(self):
-        sleeper_league = f'https://api.sleeper.app/v1/league/{self.league_id}'
-        response = requests.get(sleeper_league)
-        league_json = response.json()
+        league_json = self._get_json(self._api_url('league'))
         
         roster_positions = np.unique(league_json['roster_positions']).tolist()
         if 'BN' in roster_positions: roster_positions.remove('BN')
         if 'FLEX' in roster_positions: roster_positions.remove('FLEX')
-        self.roster_positions = roster_positions
+        self._roster_positions = roster_positions
 
     def get_league_users(self, refresh: bool = False) -> pd.DataFrame:
         """
@@ -66,29 +148,36 @@ class SleeperLeague(FantasyFootballLeague):
         if (self.dfs.get('users') is not None) and (not refresh):
             print('Returning current users dataframe.')
             df = self.dfs.get('users')
+        elif self._is_datafile_fresh('users') and (not refresh):
+            print('Reading parquet file for users.')
+            df = pd.read_parquet(self.files['users'])
+            self.dfs['users'] = df
         else:
             print('Pulling users from Sleeper API.')
-            sleeper_league_users = f'https://api.sleeper.app/v1/league/{self.league_id}/users'
-            response = requests.get(sleeper_league_users)
-            users_json = response.json()
+            users_json = self._get_json(self._api_url('users'))
             df = (
                 pd.DataFrame(users_json)
                 .drop(columns=['settings', 'is_bot', 'avatar'])
-                .assign(team_name = lambda df: [d.get('team_name') for d in df.metadata],
-                        is_commish = lambda df: df.is_owner.fillna(False).astype(np.int8))
-                .astype({'league_id': np.int64, 'user_id': np.int64})
+                # league_id isn't kept, so only user_id is parsed. It stays int64 to match owner_id in rosters and teams.
+                .assign(user_id = lambda df: pd.to_numeric(df.user_id),
+                        team_name = lambda df: [d.get('team_name') for d in df.metadata],
+                        is_commish = lambda df: df.is_owner.fillna(False).to_numpy(dtype=np.int8))
                 [['user_id', 'team_name', 'display_name', 'is_commish']]
             )
+            self._save_datafile('users', df)
             self.dfs['users'] = df
         return df
 
     @staticmethod
-    def _get_roster_spot(roster: pd.Series) -> str:
-        player_id = roster.player_id
-        if player_id in roster.starters: return 'starter'
-        if player_id in roster.taxi: return 'taxi'
-        if player_id in roster.reserve: return 'ir'
-        return 'bench'
+    def _get_roster_spots(df: pd.DataFrame) -> pd.Categorical:
+        """
+        Classifies every exploded roster row as starter, taxi, ir or bench with one membership pass per slot.
+        """
+        in_slot = [
+            np.array([player_id in players for player_id, players in zip(df.player_id.values, df[slot].values)], dtype=bool)
+            for slot in ['starters', 'taxi', 'reserve']
+        ]
+        return pd.Categorical(np.select(in_slot, ['starter', 'taxi', 'ir'], default='bench'))
     
     def build_rosters_and_teams(self) -> None:
         """
@@ -96,9 +185,7 @@ class SleeperLeague(FantasyFootballLeague):
         """
 
         print('Pulling roster data from Sleeper API.')
-        sleeper_rosters = f'https://api.sleeper.app/v1/league/{self.league_id}/rosters'
-        response = requests.get(sleeper_rosters)
-        rosters_json = response.json()
+        rosters_json = self._get_json(self._api_url('rosters'))
         
         for roster in rosters_json:
             # Replaces empty roster groups with empty list.
@@ -111,43 +198,63 @@ class SleeperLeague(FantasyFootballLeague):
                 if single_setting not in roster_settings: roster_settings[single_setting] = 0
             if 'record' not in roster_settings: roster_settings['record'] = ''
         
+        # Both frames branch off one parse of the rosters, neither chain mutates it.
+        df_base = pd.DataFrame(rosters_json)
         df_rosters = (
-            pd.DataFrame(rosters_json)
+            df_base
             .drop(columns=['player_map', 'metadata', 'co_owners', 'settings'])
             .explode('players')
             .rename(columns={'players': 'player_id'})
-            .assign(roster_spot = lambda df: df.apply(SleeperLeague._get_roster_spot, axis=1).astype('category'))
+            .assign(roster_spot = SleeperLeague._get_roster_spots)
             .drop(columns=['taxi', 'starters', 'reserve'])
             .astype({'owner_id': np.int64})
             [['owner_id' ,'roster_id', 'player_id', 'roster_spot']]
+            .assign(roster_id = lambda df: pd.to_numeric(df.roster_id, downcast='integer'))
         )
         
         df_teams = (
-            pd.DataFrame(rosters_json)
+            df_base
             # [['owner_id', 'roster_id', 'settings', 'metadata']]
             .astype({'owner_id': np.int64})
-            .pipe(lambda df: df.assign(**df.settings.apply(pd.Series, dtype='str')))
-            .pipe(lambda df: df.assign(**df.metadata.apply(pd.Series, dtype='str')))
+            .pipe(lambda df: df.assign(**expand_to_str_columns(df.settings)))
+            .pipe(lambda df: df.assign(**expand_to_str_columns(df.metadata)))
             .astype({'fpts': np.int64, 'fpts_decimal': np.int64, 'fpts_against': np.int64, 'fpts_against_decimal': np.int64, 
                      'ppts': np.int64, 'ppts_decimal': np.int64})
             # .drop(columns=['settings', 'metadata'])
             .assign(points_for = lambda df: df.fpts + (df.fpts_decimal / 100),
                     points_against = lambda df: df.fpts_against + (df.fpts_against_decimal / 100),
                     possible_points = lambda df: df.ppts + (df.ppts_decimal / 100),
-                    rostered = lambda df: df.players.apply(len).astype(np.int8),
-                    starters = lambda df: df.starters.apply(len).astype(np.int8),
-                    taxi = lambda df: df.taxi.apply(len).astype(np.int8),
-                    ir = lambda df: df.reserve.apply(len).astype(np.int8),
+                    rostered = lambda df: np.fromiter((len(x) for x in df.players.values), dtype=np.int8, count=len(df)),
+                    starters = lambda df: np.fromiter((len(x) for x in df.starters.values), dtype=np.int8, count=len(df)),
+                    taxi = lambda df: np.fromiter((len(x) for x in df.taxi.values), dtype=np.int8, count=len(df)),
+                    ir = lambda df: np.fromiter((len(x) for x in df.reserve.values), dtype=np.int8, count=len(df)),
                     bench = lambda df: (df.rostered - df.starters - df.taxi - df.ir).astype(np.int8),
                     roster_locked = lambda df: (df.starters + df.bench > 40).astype(np.int8))
             [['owner_id', 'roster_id', 
                 'division', 'wins', 'losses', 'ties', 
                 'points_for', 'points_against', 'possible_points', 'record',
                 'rostered', 'starters', 'bench', 'ir', 'taxi', 'roster_locked']]
+            # owner_id stays int64, since Sleeper user ids don't fit in 32 bits, and the points stay float64,
+            # since float32 can't hold hundredths like 500.12 exactly.
+            .pipe(lambda df: df.assign(**df[['roster_id', 'wins', 'losses', 'ties']].apply(pd.to_numeric, downcast='integer')))
+            .astype({'division': 'category', 'record': 'category'})
         )
+        self._save_datafile('rosters', df_rosters)
+        self._save_datafile('teams', df_teams)
         self.dfs['rosters'] = df_rosters
         self.dfs['teams'] = df_teams
 
+    def _load_rosters_and_teams(self, refresh: bool) -> None:
+        """
+        Reads the rosters and teams parquet files while they're fresh, otherwise rebuilds both from the API.
+        """
+        if self._is_datafile_fresh('rosters') and self._is_datafile_fresh('teams') and (not refresh):
+            print('Reading parquet files for rosters and teams.')
+            self.dfs['rosters'] = pd.read_parquet(self.files['rosters'])
+            self.dfs['teams'] = pd.read_parquet(self.files['teams'])
+        else:
+            self.build_rosters_and_teams()
+
     def get_league_rosters(self, refresh: bool = False) -> pd.DataFrame:
         """
         Returns a dataframe with the current roster of each team and where they are located.
@@ -158,7 +265,7 @@ class SleeperLeague(FantasyFootballLeague):
             print('Returning current rosters dataframes.')
             df_rosters = self.dfs.get('rosters')
         else:
-            self.build_rosters_and_teams()
+            self._load_rosters_and_teams(refresh)
             df_rosters = self.dfs.get('rosters')
 
         return df_rosters
@@ -177,20 +284,18 @@ class SleeperLeague(FantasyFootballLeague):
             print('Returning current teams dataframe.')
             df_teams = self.dfs.get('teams')
         else:
-            self.build_rosters_and_teams()
+            self._load_rosters_and_teams(refresh)
             df_teams = self.dfs.get('teams')
 
         return df_teams
 
     @staticmethod
-    def _drop_unused_positions(positions: list) -> list:
-        positions = [pos for pos in positions if pos[0] != 'O']
-        
-        if 'LEO' in positions: positions.remove('LEO')
-        if 'LS' in positions: positions.remove('LS')
-        if 'P' in positions: positions.remove('P')
-            
-        return sorted(positions)
+    def _format_fantasy_pos(positions) -> str:
+        """
+        Joins a player's fantasy positions into one label, dropping offensive line and special teams spots.
+        """
+        if not isinstance(positions, list): return ''
+        return fantasy_pos_label(tuple(positions))
         
     def get_league_players(self, refresh: bool = False) -> pd.DataFrame:
         players_filepath = self._get_datafile('players')
@@ -204,28 +309,23 @@ class SleeperLeague(FantasyFootballLeague):
             self.dfs['players'] = df_players
         else:
             print('Pulling new player list from Sleeper API.')
-            sleeper_players = 'https://api.sleeper.app/v1/players/nfl'
-            response = requests.get(sleeper_players)
-            players_json = response.json()
+            players_json = self._get_json(self._api_url('players'))
             df_players = (
-                pd.DataFrame(players_json)          
-                .T
-                .rename_axis('sleeper_id')
-                .reset_index()
+                pd.DataFrame.from_records([{'sleeper_id': k, **v} for k, v in players_json.items()])
                 .drop(columns=['hashtag', 'news_updated', 'sport',
                                'sleeper_id', 'pandascore_id', 'rotowire_id', 'espn_id', 'yahoo_id', 
                                'sportradar_id', 'stats_id', 'fantasy_data_id', 'swish_id', 'gsis_id', 'rotoworld_id',
                                'birth_date', 'birth_city', 'birth_state', 'birth_country', 
                                'height', 'weight', 'high_school', 'college',
                                'search_first_name', 'search_last_name', 'search_full_name'])
-                .assign(fantasy_positions = lambda df: df.fantasy_positions.apply(lambda d: d if isinstance(d, list) else []),
-                        fantasy_pos = lambda df: df.fantasy_positions.apply(list).apply(SleeperLeague._drop_unused_positions).apply('/'.join),
+                .assign(fantasy_pos = lambda df: [SleeperLeague._format_fantasy_pos(d) for d in df.fantasy_positions.values],
                         active = lambda df: df.active.fillna('False').astype(bool)
                         )
-                .query('(fantasy_pos != "") and active')
+                .loc[lambda df: (df.fantasy_pos.to_numpy() != '') & df.active.to_numpy(dtype=bool)]
                 .drop(columns=['fantasy_positions', 'active'])
+                .astype({'fantasy_pos': 'category', 'team': 'category', 'position': 'category', 'status': 'category'})
             )
-            df_players.to_parquet(players_filepath)
+            df_players.to_parquet(players_filepath, compression='zstd', index=False)
             self.dfs['players'] = df_players
         return df_players
     
\ No newline at end of file
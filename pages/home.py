@@ -1,51 +1,13 @@
 from dash import html, dash_table
-import pandas as pd
 
 from ff_league_analyzer.ff_league_analyzer import SleeperLeagueAnalyzer
+from pages.table_helpers import (
+    STYLE_CELL_CONDITIONAL, STYLE_DATA_CONDITIONAL, STYLE_HEADER_CONDITIONAL, get_external_column_names, get_table_records
+)
 
-def get_external_column_names(df: pd.DataFrame) -> list:
-    """
-    Converts position columns to uppercase.
-    """
-    name_mapping = {
-        'team_name': 'Team Name',
-        'display_name': 'User',
-        'points_for': 'Points For',
-        'points_against': 'Points Against'
-        }
-    names = [{'id': col, 'name': name_mapping.get(col, col.capitalize())} for col in df.columns]
-    return names
-
-def get_style_cell_conditional(df: pd.DataFrame) -> list:
-    """Sets specific widths for some columns (default is 5%)."""
-    width_mapping = {
-        'team_name': '15%',
-        'display_name': '10%'
-    }
-    widths = [{'if': {'column_id': col}, 'width': width} for col, width in width_mapping.items()]
-    return widths
-
-def get_style_data_conditional(df: pd.DataFrame) -> list:
-    style_list = [
-        {
-            'if': {'row_index': 'odd'}, 
-            'backgroundColor': 'rgb(255, 225, 200)'
-        },
-        {
-            'if': {'column_id': ['team_name', 'display_name']}, 
-            'textAlign': 'left'
-        }
-    ]
-    return style_list
-
-def get_style_header_conditional() -> list:
-    style_list = [
-        {
-            'if': {'column_id': ['team_name', 'display_name']}, 
-            'textAlign': 'left'
-        }
-    ]
-    return style_list
+COLUMN_NAMES = (
+    ('team_name', 'Team Name'), ('display_name', 'User'), ('points_for', 'Points For'), ('points_against', 'Points Against')
+)
 
 def layout(league_analyzer: SleeperLeagueAnalyzer):
     if league_analyzer is None: return html.Div()
@@ -54,21 +16,21 @@ def layout(league_analyzer: SleeperLeagueAnalyzer):
 
     layout = html.Div([
         dash_table.DataTable(
-            df.to_dict('records'),
-            columns=get_external_column_names(df),
+            get_table_records(df),
+            columns=list(get_external_column_names(tuple(df.columns), COLUMN_NAMES)),
             sort_action='native',
             fill_width=False,
             style_cell={
                 'width': '5%'
             },
-            style_cell_conditional=get_style_cell_conditional(df),
-            style_data_conditional=get_style_data_conditional(df),
+            style_cell_conditional=list(STYLE_CELL_CONDITIONAL),
+            style_data_conditional=list(STYLE_DATA_CONDITIONAL),
             style_header={
                 'backgroundColor': 'rgb(200, 100, 0)',
                 'color': 'black',
                 'fontWeight': 'bold',
             },
-            style_header_conditional=get_style_header_conditional(),
+            style_header_conditional=list(STYLE_HEADER_CONDITIONAL),
         )
     ])
     return layout
\ No newline at end of file
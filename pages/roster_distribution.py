@@ -1,42 +1,18 @@
 from dash import html, dash_table
-import pandas as pd
+from functools import lru_cache
 
 from ff_league_analyzer.ff_league_analyzer import SleeperLeagueAnalyzer
+from pages import table_helpers
+from pages.table_helpers import get_external_column_names, get_table_records
 
-def get_external_column_names(df: pd.DataFrame) -> list:
-    """
-    Converts position columns to uppercase.
-    """
-    name_mapping = {
-        'team_name': 'Team Name',
-        'display_name': 'User',
-        'record': 'Record'
-        }
-    names = [{'id': col, 'name': name_mapping.get(col, col.upper())} for col in df.columns]
-    return names
+COLUMN_NAMES = (('team_name', 'Team Name'), ('display_name', 'User'), ('record', 'Record'))
 
-def get_style_cell_conditional(df: pd.DataFrame) -> list:
-    """Sets specific widths for some columns (default is 5%)."""
-    width_mapping = {
-        'team_name': '15%',
-        'display_name': '10%',
-        'record': '5%'
-    }
-    widths = [{'if': {'column_id': col}, 'width': width} for col, width in width_mapping.items()]
-    return widths
+STYLE_CELL_CONDITIONAL = table_helpers.STYLE_CELL_CONDITIONAL + ({'if': {'column_id': 'record'}, 'width': '5%'},)
 
-def get_style_data_conditional(df: pd.DataFrame) -> list:
-    style_list = [
-        {
-            'if': {'row_index': 'odd'}, 
-            'backgroundColor': 'rgb(255, 225, 200)'
-        },
-        {
-            'if': {'column_id': ['team_name', 'display_name']}, 
-            'textAlign': 'left'
-        }
-    ]
-    highlight_top = [
+# The highlights change with the league's thresholds, so they're cached per threshold set.
+@lru_cache(maxsize=16)
+def get_style_data_conditional(thresholds: tuple) -> tuple:
+    highlight_top = tuple(
         {
             'if': {
                 'filter_query': f'{{{col}}} >= {value}',
@@ -44,17 +20,8 @@ def get_style_data_conditional(df: pd.DataFrame) -> list:
             },
             'fontWeight': 'bold',
             'border': '3px solid rgb(0, 200, 0)'
-        } for (col, value) in df.quantile(0.9).iteritems()]
-    return style_list + highlight_top
-
-def get_style_header_conditional() -> list:
-    style_list = [
-        {
-            'if': {'column_id': ['team_name', 'display_name']}, 
-            'textAlign': 'left'
-        }
-    ]
-    return style_list
+        } for (col, value) in thresholds)
+    return table_helpers.STYLE_DATA_CONDITIONAL + highlight_top
 
 def layout(league_analyzer: SleeperLeagueAnalyzer):
     if league_analyzer is None: return html.Div()
@@ -63,21 +30,21 @@ def layout(league_analyzer: SleeperLeagueAnalyzer):
 
     layout = html.Div([
         dash_table.DataTable(
-            df.to_dict('records'),
-            columns=get_external_column_names(df),
+            get_table_records(df),
+            columns=list(get_external_column_names(tuple(df.columns), COLUMN_NAMES, str.upper)),
             sort_action='native',
             fill_width=False,
             style_cell={
                 'width': '5%'
             },
-            style_cell_conditional=get_style_cell_conditional(df),
-            style_data_conditional=get_style_data_conditional(df),
+            style_cell_conditional=list(STYLE_CELL_CONDITIONAL),
+            style_data_conditional=list(get_style_data_conditional(tuple(league_analyzer.get_roster_distribution_thresholds().items()))),
             style_header={
                 'backgroundColor': 'rgb(200, 100, 0)',
                 'color': 'black',
                 'fontWeight': 'bold',
             },
-            style_header_conditional=get_style_header_conditional(),
+            style_header_conditional=list(table_helpers.STYLE_HEADER_CONDITIONAL),
         )
     ])
     return layout
\ No newline at end of file
@@ -0,0 +1,41 @@
+from functools import lru_cache
+import pandas as pd
+
+# Styles shared by every team table.
+STYLE_CELL_CONDITIONAL = (
+    {'if': {'column_id': 'team_name'}, 'width': '15%'},
+    {'if': {'column_id': 'display_name'}, 'width': '10%'},
+)
+
+STYLE_DATA_CONDITIONAL = (
+    {
+        'if': {'row_index': 'odd'}, 
+        'backgroundColor': 'rgb(255, 225, 200)'
+    },
+    {
+        'if': {'column_id': ['team_name', 'display_name']}, 
+        'textAlign': 'left'
+    }
+)
+
+STYLE_HEADER_CONDITIONAL = (
+    {
+        'if': {'column_id': ['team_name', 'display_name']}, 
+        'textAlign': 'left'
+    },
+)
+
+def get_table_records(df: pd.DataFrame) -> list:
+    """
+    Builds the DataTable rows from whole columns, rather than walking the frame row by row like to_dict('records').
+    """
+    columns = df.columns.tolist()
+    return [dict(zip(columns, row)) for row in zip(*(df[col].tolist() for col in columns))]
+
+@lru_cache(maxsize=16)
+def get_external_column_names(columns: tuple, name_mapping: tuple, format_name=str.capitalize) -> tuple:
+    """
+    Display names for the table's columns, from the page's (column, name) pairs or else format_name.
+    """
+    names = dict(name_mapping)
+    return tuple({'id': col, 'name': names.get(col, format_name(col))} for col in columns)
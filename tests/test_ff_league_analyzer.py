@@ -0,0 +1,44 @@
+from ff_league_analyzer.ff_league_analyzer import SleeperLeagueAnalyzer
+
+def make_analyzer() -> SleeperLeagueAnalyzer:
+    """
+    Analyzer for a QB/RB league, built without pulling the league from Sleeper.
+    """
+    analyzer = SleeperLeagueAnalyzer.__new__(SleeperLeagueAnalyzer)
+    analyzer._start_slot_cols = ('start_qb', 'start_rb')
+    analyzer._start_pos_order = ('start_qb', 'start_rb')
+    analyzer._pos_order = ('qb_score', 'rb_score')
+    analyzer._player_pos_map = {'11': 'QB', '12': 'RB', '21': 'QB', '22': 'RB', '31': 'QB', '32': 'RB'}
+    return analyzer
+
+def matchup_row(roster_id: int, matchup_id, qb_points: float, rb_points: float) -> dict:
+    qb, rb = f'{roster_id}1', f'{roster_id}2'
+    return {
+        'roster_id': roster_id,
+        'matchup_id': matchup_id,
+        'points': qb_points + rb_points,
+        'starters': [qb, rb],
+        'starters_points': [qb_points, rb_points],
+        'players': [qb, rb],
+        'players_points': {qb: qb_points, rb: rb_points},
+        'custom_points': None,
+    }
+
+def test_unpaired_matchup_has_no_opponent():
+    matchups = {1: [matchup_row(1, 1, 10.0, 5.0), matchup_row(2, 1, 8.0, 4.0), matchup_row(3, 2, 7.0, 6.0)]}
+    df = make_analyzer()._combine_weekly_matchups(matchups).set_index('roster_id')
+
+    assert df.loc[1, 'opponent_id'] == 2
+    assert df.loc[1, 'result'] == 'Win'
+    assert df.loc[2, 'opponent_id'] == 1
+    assert df.loc[2, 'result'] == 'Loss'
+    assert df.loc[3, 'opponent_id'] == -1
+    assert df.loc[3, 'opp_points'] == 0
+    assert df.loc[3, 'result'] == 'No matchup'
+
+def test_bye_week_has_no_opponent():
+    matchups = {1: [matchup_row(1, 1, 10.0, 5.0), matchup_row(2, 1, 8.0, 4.0), matchup_row(3, None, 7.0, 6.0)]}
+    df = make_analyzer()._combine_weekly_matchups(matchups).set_index('roster_id')
+
+    assert df.loc[3, 'opponent_id'] == -1
+    assert df.loc[3, 'result'] == 'No matchup'